@@ -24,7 +24,7 @@ from ..tools.report_generation_tool import generate_comprehensive_business_repor
 from ..tools.backend_health_tool import check_backend_status, get_available_endpoints
 from ..tools.cookbook_analysis_tool import get_all_cookbook_items, get_recipe_details, analyze_menu_profitability, analyze_dish_cost_breakdown, get_menu_performance_analytics, calculate_recipe_costs_from_inventory
 from ..tools.wastage_analysis_tool import get_wastage_summary, analyze_wastage_by_product, track_wastage_trends, get_wastage_trends, get_top_wastage_products, get_wastage_by_date
-from ..tools.tenancy_management_tool import get_tenant_information, analyze_product_catalog, get_location_overview
+from ..tools.tenancy_management_tool import get_tenant_information, list_tenants, analyze_product_catalog, get_location_overview
 from ..tools.batch_tracking_tool import get_batch_history, analyze_inventory_by_product, get_expiry_alerts
 from ..tools.order_management_tool import analyze_order_patterns, estimate_daily_orders, track_menu_item_demand
 from ..tools.endpoint_discovery_tool import discover_available_endpoints, verify_endpoint_data_quality
@@ -101,6 +101,7 @@ AVAILABLE_TOOLS = {
     
     # Tenancy & Product Catalog
     "get_tenant_information": get_tenant_information,
+    "list_tenants": list_tenants,
     "analyze_product_catalog": analyze_product_catalog,
     "get_location_overview": get_location_overview,
     
@@ -238,6 +239,11 @@ TOOL_SCHEMAS = {
         },
         "use_when": "User asks about business locations, tenant info, company overview, store locations"
     },
+    "list_tenants": {
+        "description": "List tenants only (single fast call, no locations or products)",
+        "parameters": {},
+        "use_when": "User asks which tenants/businesses exist or their status, without location or catalog detail"
+    },
     "analyze_product_catalog": {
         "description": "Analyze product catalog structure and pricing",
         "parameters": {
@@ -608,6 +614,7 @@ def format_tool_output(tool_name: str, data: Dict[str, Any]) -> str:
         
         # Tenancy & Product Catalog
         "get_tenant_information": format_tenant_insights,
+        "list_tenants": format_tenant_insights,
         "analyze_product_catalog": format_catalog_insights,
         "get_location_overview": format_location_insights,
         
@@ -1065,16 +1072,20 @@ def format_tenant_insights(data: Dict[str, Any]) -> str:
     if business_insights:
         insights.append(f"• Total Tenants: {business_insights.get('total_tenants', 0)}")
         insights.append(f"• Active Tenants: {business_insights.get('active_tenants', 0)}")
-        insights.append(f"• Total Locations: {business_insights.get('total_locations', 0)}")
-        insights.append(f"• Multi-location Tenants: {business_insights.get('multi_location_tenants', 0)}")
+        # Location totals are absent when locations were not fetched (e.g. list_tenants)
+        if 'total_locations' in business_insights:
+            insights.append(f"• Total Locations: {business_insights['total_locations']}")
+            insights.append(f"• Multi-location Tenants: {business_insights.get('multi_location_tenants', 0)}")
     
     tenant_info = data.get('tenant_information', [])
     if tenant_info:
         insights.append(f"\n**TENANT DETAILS:**")
         for tenant in tenant_info[:3]:
             name = tenant.get('name', 'Unknown')
-            location_count = tenant.get('location_count', 0)
-            insights.append(f"• {name}: {location_count} locations")
+            if 'location_count' in tenant:
+                insights.append(f"• {name}: {tenant['location_count']} locations")
+            else:
+                insights.append(f"• {name} ({tenant.get('status', 'active')})")
     
     return "\n".join(insights)
 
@@ -0,0 +1,205 @@
+"""
+Shared API Client for LangGraph Tools
+One pooled async HTTP client for the inventory backend, reused across tool modules
+"""
+
+import httpx
+import asyncio
+import logging
+import os
+import time
+import orjson
+from cachetools import LRUCache
+from typing import Optional, Dict, Any, MutableMapping, Tuple
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
+X_TENANT_ID = os.getenv("X_TENANT_ID", "11111111-1111-1111-1111-111111111111")
+X_LOCATION_ID = os.getenv("X_LOCATION_ID", "22222222-2222-2222-2222-222222222222")
+MAX_RESPONSE_BYTES = int(os.getenv("MAX_RESPONSE_BYTES", str(20 * 1024 * 1024)))
+
+logger = logging.getLogger(__name__)
+
+# Shared async client so every importing tool draws on one connection pool.
+# httpx advertises gzip/deflate (and br when brotli is installed) and decodes transparently.
+CLIENT = httpx.AsyncClient(
+    base_url=BASE_URL,
+    headers={"Content-Type": "application/json"},
+    timeout=httpx.Timeout(10.0, connect=3.0),
+    transport=httpx.AsyncHTTPTransport(
+        retries=2,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    )
+)
+
+# Per-request headers, built once at import
+_TENANT_HEADERS = {"X-Tenant-ID": X_TENANT_ID} if X_TENANT_ID else {}
+_WASTAGE_HEADERS = {**_TENANT_HEADERS, "X-Location-ID": X_LOCATION_ID}
+
+# Gateway errors worth retrying on GETs for callers that opt in, and how many times
+_RETRY_STATUSES = frozenset({502, 503, 504})
+_MAX_STATUS_RETRIES = 2
+
+# Last ETag and decoded body per request, revalidated with If-None-Match
+_ETAG_CACHE = LRUCache(maxsize=64)
+
+# Circuit breaker: after this many consecutive failures within the window,
+# calls to that host fail fast for the cooldown period
+_BREAKER_FAILURE_THRESHOLD = 5
+_BREAKER_WINDOW_SECONDS = 30
+_BREAKER_COOLDOWN_SECONDS = 15
+_breaker_state: Dict[str, Dict[str, float]] = {}
+
+def request_headers(endpoint: str) -> Dict[str, str]:
+    """Helper function to pick the tenant and location headers an endpoint needs"""
+    # Tenancy endpoints are not scoped to a tenant; wastage endpoints also need the location
+    if "/tenancy/" in endpoint:
+        return {}
+    if "/wastage" in endpoint:
+        return _WASTAGE_HEADERS
+    return _TENANT_HEADERS
+
+def _circuit_open(host: str) -> bool:
+    """Check whether calls to a host are currently short-circuited"""
+    state = _breaker_state.get(host)
+    return bool(state) and time.monotonic() < state["open_until"]
+
+def _record_success(host: str) -> None:
+    """Reset the failure count for a host after a successful call"""
+    state = _breaker_state.pop(host, None)
+    if state and state["open_until"]:
+        logger.info("Circuit closed for %s", host)
+
+def _record_failure(host: str) -> None:
+    """Count a failed call and open the circuit once the threshold is reached"""
+    now = time.monotonic()
+    state = _breaker_state.get(host)
+    if state is None or now - state["first_failure"] > _BREAKER_WINDOW_SECONDS:
+        state = {"failures": 0, "first_failure": now, "open_until": 0}
+        _breaker_state[host] = state
+
+    state["failures"] += 1
+    if state["failures"] >= _BREAKER_FAILURE_THRESHOLD:
+        state["open_until"] = now + _BREAKER_COOLDOWN_SECONDS
+        logger.warning("Circuit opened for %s after %d consecutive failures", host, state["failures"])
+
+def _error_response(endpoint: str, message: str) -> Dict[str, Any]:
+    """Helper function to build the error payload tools check for"""
+    return {
+        "error": True,
+        "message": message,
+        "endpoint": endpoint
+    }
+
+def _fallback_response(key: tuple, endpoint: str, message: str, stale_cache: Optional[MutableMapping]) -> Dict[str, Any]:
+    """Serve the last good response for a call the backend could not answer, or an error payload"""
+    stale = stale_cache.get(key) if stale_cache is not None else None
+    if isinstance(stale, dict):
+        return {**stale, "stale": True}
+    return _error_response(endpoint, message)
+
+async def _send(method: str, endpoint: str, headers: Dict[str, str], content: Optional[bytes], params: Optional[Dict]) -> Tuple[httpx.Response, bytes]:
+    """Helper function to send one request and read its body under the size limit"""
+    async with CLIENT.stream(method, endpoint, headers=headers, content=content, params=params) as response:
+        # Error and not-modified responses are judged by status alone
+        if response.status_code == 304 or response.is_error:
+            return response, b""
+
+        # Reject oversized payloads before downloading the body
+        content_length = int(response.headers.get("Content-Length", 0))
+        if content_length > MAX_RESPONSE_BYTES:
+            raise ValueError(f"Response of {content_length} bytes exceeds the {MAX_RESPONSE_BYTES} byte limit")
+
+        # Enforce the cap while reading too: chunked or compressed responses carry no usable
+        # Content-Length, and aiter_bytes yields the decoded body as it arrives
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) > MAX_RESPONSE_BYTES:
+                raise ValueError(f"Response exceeds the {MAX_RESPONSE_BYTES} byte limit")
+        return response, bytes(body)
+
+async def make_api_call(
+    endpoint: str,
+    method: str = "GET",
+    data: Optional[Dict] = None,
+    params: Optional[Dict] = None,
+    cache: Optional[MutableMapping] = None,
+    stale_cache: Optional[MutableMapping] = None,
+    retry_gateway_errors: bool = False
+) -> Dict[str, Any]:
+    """
+    Helper function to make API calls with proper headers.
+
+    Tool modules pass their own response caches so each keeps its freshness policy:
+    cache serves GET responses while they are fresh, and stale_cache keeps the last good
+    response to serve when the backend is unavailable (transport errors, 5xx, open circuit).
+    retry_gateway_errors retries 502/503/504 on GETs with a short backoff.
+    """
+    key = (endpoint, tuple(sorted(params.items())) if params else None)
+    use_cache = method == "GET"
+    if use_cache and cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    host = CLIENT.base_url.host
+    if _circuit_open(host):
+        return _fallback_response(key, endpoint, f"API call skipped: backend {host} is unavailable", stale_cache)
+
+    headers = request_headers(endpoint)
+
+    # Inventory and cookbook change on a scale of minutes; revalidate instead of refetching
+    revalidate = method == "GET" and ("/inventory" in endpoint or "/cookbook" in endpoint)
+    etag_entry = _ETAG_CACHE.get(key) if revalidate else None
+    if etag_entry:
+        headers = {**headers, "If-None-Match": etag_entry[0]}
+
+    try:
+        if method not in ("GET", "POST"):
+            raise ValueError(f"Unsupported method: {method}")
+
+        # Content-Type: application/json is already a client default header
+        body = orjson.dumps(data) if data is not None else None
+        response, content = await _send(method, endpoint, headers, body, params)
+
+        # Retry transient gateway errors on idempotent GETs with a short backoff
+        attempt = 0
+        while retry_gateway_errors and method == "GET" and response.status_code in _RETRY_STATUSES and attempt < _MAX_STATUS_RETRIES:
+            await asyncio.sleep(0.25 * 2 ** attempt)
+            attempt += 1
+            response, content = await _send(method, endpoint, headers, body, params)
+
+        if etag_entry and response.status_code == 304:
+            result = etag_entry[1]
+        else:
+            response.raise_for_status()
+            result = orjson.loads(content)
+            etag = response.headers.get("ETag") if revalidate else None
+            if etag:
+                _ETAG_CACHE[key] = (etag, result)
+
+        _record_success(host)
+        if use_cache:
+            if cache is not None:
+                cache[key] = result
+            if stale_cache is not None:
+                stale_cache[key] = result
+        return result
+    except (httpx.HTTPError, ValueError) as e:
+        message = f"API call failed: {str(e)}"
+        # Only transport errors and server errors count against the backend or justify stale data;
+        # client errors and oversized bodies are returned as they are
+        if isinstance(e, httpx.TransportError) or (
+            isinstance(e, httpx.HTTPStatusError) and e.response.status_code >= 500
+        ):
+            _record_failure(host)
+            return _fallback_response(key, endpoint, message, stale_cache)
+        return _error_response(endpoint, message)
+
+async def api_get(endpoint: str) -> Dict[str, Any]:
+    """Helper function to make a GET call through the shared client"""
+    return await make_api_call(endpoint)
+
+async def api_post(endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
+    """Helper function to make a POST call through the shared client"""
+    return await make_api_call(endpoint, method="POST", data=data)
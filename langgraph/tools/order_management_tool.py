@@ -6,11 +6,27 @@ Analyzes order patterns using real inventory movement data and cookbook informat
 from langchain_core.tools import tool
 import requests
 import os
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timedelta
+from collections import Counter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 X_TENANT_ID = os.getenv("X_TENANT_ID", "11111111-1111-1111-1111-111111111111")
+# Opt-in: only backends that serve /api/v1/_bundle should enable this
+ENABLE_BUNDLE_ENDPOINT = os.getenv("ENABLE_BUNDLE_ENDPOINT", "false").lower() in ("1", "true", "yes")
+
+# Stock status -> (demand score, order frequency, estimated daily orders)
+_STOCK_SCORE = {
+    "low_stock": (3, "High", 8),
+    "good_stock": (2, "Medium", 4),
+    "out_of_stock": (1, "Low", 2)
+}
+_DEFAULT_STOCK_SCORE = (0, "Low", 2)
 
 def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
     """Helper function to make API calls with proper headers"""
@@ -29,14 +45,64 @@ def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = Non
             raise ValueError(f"Unsupported method: {method}")
             
         response.raise_for_status()
+        if orjson is not None:
+            return orjson.loads(response.content)
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         return {
             "error": True,
             "message": f"API call failed: {str(e)}",
             "endpoint": endpoint
         }
 
+def fetch_inventory_and_cookbook() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Helper function to fetch inventory and cookbook, in one round trip when the bundle endpoint is enabled"""
+    if ENABLE_BUNDLE_ENDPOINT:
+        bundle = make_api_call("/api/v1/_bundle?parts=inventory,cookbook")
+        if isinstance(bundle, dict) and not bundle.get("error") and "inventory" in bundle and "cookbook" in bundle:
+            return bundle["inventory"], bundle["cookbook"]
+        # Any bundle failure (404/405/501, connection error, bad payload) falls back to separate calls
+    
+    return make_api_call("/api/v1/inventory"), make_api_call("/api/v1/cookbook")
+
+def get_menu_items(cookbook_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Helper function to filter cookbook entries down to menu items"""
+    return [item for item in cookbook_data.get("data", []) if item.get("type") == "menu_item"]
+
+def build_menu_index(menu_items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Helper function to index menu items by recipe and ingredient"""
+    # Create ingredient-to-menu mapping and a token index for fuzzy matching
+    ingredient_menu_mapping = {}
+    ingredient_token_index = {}
+    menu_recipes = {}
+    
+    for menu_item in menu_items:
+        menu_name = menu_item.get("name", "")
+        ingredients = menu_item.get("recipe", {}).get("ingredients", [])
+        menu_recipes[menu_name] = {
+            "price": float(menu_item.get("price", 0)),
+            "category": menu_item.get("category", "uncategorized"),
+            "ingredients": ingredients,
+            "ingredients_lower": [ing.get("name", "").lower() for ing in ingredients]
+        }
+        
+        # Map ingredients to this menu item
+        for ing_name in menu_recipes[menu_name]["ingredients_lower"]:
+            if ing_name not in ingredient_menu_mapping:
+                ingredient_menu_mapping[ing_name] = []
+            ingredient_menu_mapping[ing_name].append(menu_name)
+            
+            for token in ing_name.split():
+                if len(token) >= 3:
+                    # dict as an insertion-ordered set keeps match order deterministic
+                    ingredient_token_index.setdefault(token, {})[menu_name] = None
+    
+    return {
+        "menu_recipes": menu_recipes,
+        "ingredient_menu_mapping": ingredient_menu_mapping,
+        "ingredient_token_index": ingredient_token_index
+    }
+
 @tool
 def analyze_order_patterns(
     date_range: str = "last_7_days",
@@ -53,10 +119,11 @@ def analyze_order_patterns(
         Order patterns derived from inventory movements and menu data
     """
     
+    generated_at = datetime.now().isoformat()
+    
     try:
         # Fetch real data
-        inventory_data = make_api_call("/api/v1/inventory")
-        cookbook_data = make_api_call("/api/v1/cookbook")
+        inventory_data, cookbook_data = fetch_inventory_and_cookbook()
         
         if inventory_data.get("error") or cookbook_data.get("error"):
             return {
@@ -66,29 +133,13 @@ def analyze_order_patterns(
             }
         
         inventory_items = inventory_data.get("ingredient_items", [])
-        cookbook_items = cookbook_data.get("data", [])
-        
-        # Filter menu items
-        menu_items = [item for item in cookbook_items if item.get("type") == "menu_item"]
         
-        # Create ingredient-to-menu mapping
-        ingredient_menu_mapping = {}
-        menu_recipes = {}
-        
-        for menu_item in menu_items:
-            menu_name = menu_item.get("name", "")
-            menu_recipes[menu_name] = {
-                "price": float(menu_item.get("price", 0)),
-                "category": menu_item.get("category", "uncategorized"),
-                "ingredients": menu_item.get("recipe", {}).get("ingredients", [])
-            }
-            
-            # Map ingredients to this menu item
-            for ingredient in menu_recipes[menu_name]["ingredients"]:
-                ing_name = ingredient.get("name", "").lower()
-                if ing_name not in ingredient_menu_mapping:
-                    ingredient_menu_mapping[ing_name] = []
-                ingredient_menu_mapping[ing_name].append(menu_name)
+        # Filtered menu items and ingredient-to-menu mapping
+        menu_items = get_menu_items(cookbook_data)
+        menu_index = build_menu_index(menu_items)
+        menu_recipes = menu_index["menu_recipes"]
+        ingredient_menu_mapping = menu_index["ingredient_menu_mapping"]
+        ingredient_token_index = menu_index["ingredient_token_index"]
         
         # Analyze order patterns from inventory activity
         order_patterns = {}
@@ -100,31 +151,15 @@ def analyze_order_patterns(
                 inv_name = inv_item.get("name", "").lower()
                 stock_status = inv_item.get("stock_status", "unknown")
                 
-                # Find which menu items use this ingredient
-                related_menu_items = []
-                
-                # Direct name matching
-                if inv_name in ingredient_menu_mapping:
-                    related_menu_items.extend(ingredient_menu_mapping[inv_name])
+                # Find which menu items use this ingredient (ordered, de-duplicated)
+                related_menu_items = dict.fromkeys(ingredient_menu_mapping.get(inv_name, ()))
                 
-                # Fuzzy matching for common ingredients
-                for menu_name, recipe_info in menu_recipes.items():
-                    for ingredient in recipe_info["ingredients"]:
-                        ingredient_name = ingredient.get("name", "").lower()
-                        if inv_name in ingredient_name or ingredient_name in inv_name:
-                            if menu_name not in related_menu_items:
-                                related_menu_items.append(menu_name)
+                # Fuzzy matching for common ingredients via shared name tokens
+                for token in inv_name.split():
+                    related_menu_items.update(ingredient_token_index.get(token, {}))
                 
                 # Estimate order frequency based on stock status
-                if stock_status == "low_stock":
-                    order_frequency = "High"
-                    estimated_daily_orders = 8
-                elif stock_status == "good_stock" and inv_item.get("has_recent_activity"):
-                    order_frequency = "Medium"
-                    estimated_daily_orders = 4
-                else:
-                    order_frequency = "Low"
-                    estimated_daily_orders = 2
+                _, order_frequency, estimated_daily_orders = _STOCK_SCORE.get(stock_status, _DEFAULT_STOCK_SCORE)
                 
                 # Track patterns for related menu items
                 for menu_name in related_menu_items:
@@ -132,7 +167,7 @@ def analyze_order_patterns(
                         order_patterns[menu_name] = {
                             "estimated_daily_orders": 0,
                             "order_frequency": "Low",
-                            "active_ingredients": [],
+                            "active_ingredients": {},
                             "category": menu_recipes[menu_name]["category"],
                             "price": menu_recipes[menu_name]["price"],
                             "estimated_daily_revenue": 0
@@ -140,7 +175,7 @@ def analyze_order_patterns(
                     
                     # Aggregate estimates
                     order_patterns[menu_name]["estimated_daily_orders"] += estimated_daily_orders
-                    order_patterns[menu_name]["active_ingredients"].append(inv_item.get("name"))
+                    order_patterns[menu_name]["active_ingredients"][inv_item.get("name")] = None
                     order_patterns[menu_name]["order_frequency"] = order_frequency
                     
                     # Calculate revenue
@@ -240,7 +275,7 @@ def analyze_order_patterns(
                 "menu_item": menu_item_focus,
                 "estimated_daily_orders": focus_pattern["estimated_daily_orders"],
                 "estimated_daily_revenue": round(focus_pattern["estimated_daily_revenue"], 2),
-                "active_ingredients": focus_pattern["active_ingredients"],
+                "active_ingredients": list(focus_pattern["active_ingredients"]),
                 "order_trend": focus_pattern["order_frequency"]
             }
         
@@ -252,7 +287,7 @@ def analyze_order_patterns(
             "source_endpoints": ["/api/v1/inventory", "/api/v1/cookbook"],
             "calculation_method": "Inventory activity mapping to menu items for order estimation",
             "data_freshness": "Real-time",
-            "generated_at": datetime.now().isoformat()
+            "generated_at": generated_at
         }
         
     except Exception as e:
@@ -274,10 +309,11 @@ def estimate_daily_orders(target_date: str) -> Dict[str, Any]:
         Daily order estimates based on inventory and menu data
     """
     
+    generated_at = datetime.now().isoformat()
+    
     try:
         # Get current data (in real implementation, would get historical data for target_date)
-        inventory_data = make_api_call("/api/v1/inventory")
-        cookbook_data = make_api_call("/api/v1/cookbook")
+        inventory_data, cookbook_data = fetch_inventory_and_cookbook()
         
         if inventory_data.get("error") or cookbook_data.get("error"):
             return {
@@ -286,13 +322,12 @@ def estimate_daily_orders(target_date: str) -> Dict[str, Any]:
             }
         
         inventory_items = inventory_data.get("ingredient_items", [])
-        cookbook_items = cookbook_data.get("data", [])
         
         # Get active ingredients (proxy for recent ordering)
         active_ingredients = [item for item in inventory_items if item.get("has_recent_activity")]
         
         # Menu items mapping
-        menu_items = [item for item in cookbook_items if item.get("type") == "menu_item"]
+        menu_items = get_menu_items(cookbook_data)
         
         # Estimate orders based on ingredient activity
         daily_estimates = []
@@ -393,7 +428,7 @@ def estimate_daily_orders(target_date: str) -> Dict[str, Any]:
                 "Seasonal variations not accounted for"
             ],
             "data_freshness": "Real-time",
-            "generated_at": datetime.now().isoformat()
+            "generated_at": generated_at
         }
         
     except Exception as e:
@@ -419,10 +454,11 @@ def track_menu_item_demand(
         Demand analysis based on ingredient consumption patterns
     """
     
+    generated_at = datetime.now().isoformat()
+    
     try:
         # Get real data
-        inventory_data = make_api_call("/api/v1/inventory")
-        cookbook_data = make_api_call("/api/v1/cookbook")
+        inventory_data, cookbook_data = fetch_inventory_and_cookbook()
         
         if inventory_data.get("error") or cookbook_data.get("error"):
             return {
@@ -449,7 +485,7 @@ def track_menu_item_demand(
             
             menu_items_to_analyze = [target_item]
         else:
-            menu_items_to_analyze = [item for item in cookbook_items if item.get("type") == "menu_item"]
+            menu_items_to_analyze = get_menu_items(cookbook_data)
         
         # Demand analysis for each menu item
         demand_analysis = []
@@ -460,9 +496,39 @@ def track_menu_item_demand(
             recipe = menu_item.get("recipe", {})
             ingredients = recipe.get("ingredients", [])
             
+            # No recipe to trace - record the item without scanning inventory
+            if not ingredients:
+                demand_analysis.append({
+                    "menu_item": menu_name,
+                    "menu_item_id": menu_item.get("id", ""),
+                    "price": menu_price,
+                    "demand_metrics": {
+                        "demand_level": "Very Low",
+                        "demand_percentage": 0,
+                        "demand_score": 0,
+                        "max_possible_score": 0,
+                        "trend_direction": "Decreasing"
+                    },
+                    "ingredient_analysis": {
+                        "total_ingredients": 0,
+                        "tracked_ingredients": 0,
+                        "active_ingredients": 0,
+                        "low_stock_ingredients": 0
+                    },
+                    "detailed_ingredient_signals": [],
+                    "recommendations": [
+                        "Low demand - review recipe or pricing",
+                        "Consider seasonal menu rotation"
+                    ]
+                })
+                continue
+            
             # Analyze ingredient demand patterns
             ingredient_demand_signals = []
             total_demand_score = 0
+            tracked_count = 0
+            active_count = 0
+            low_stock_count = 0
             
             for ingredient in ingredients:
                 ing_name = ingredient.get("name", "").lower()
@@ -480,17 +546,19 @@ def track_menu_item_demand(
                     has_activity = matching_inv_item.get("has_recent_activity", False)
                     current_qty = float(matching_inv_item.get("available_qty", 0))
                     
-                    # Demand scoring
-                    demand_score = 0
-                    if stock_status == "low_stock":
-                        demand_score += 3
-                    elif stock_status == "good_stock" and has_activity:
-                        demand_score += 2
-                    elif stock_status == "out_of_stock":
-                        demand_score += 1  # Past demand
+                    # Demand scoring (out_of_stock still signals past demand)
+                    if stock_status == "good_stock" and not has_activity:
+                        demand_score = 0
+                    else:
+                        demand_score = _STOCK_SCORE.get(stock_status, _DEFAULT_STOCK_SCORE)[0]
                     
                     if has_activity:
                         demand_score += 2
+                        active_count += 1
+                    
+                    tracked_count += 1
+                    if stock_status == "low_stock":
+                        low_stock_count += 1
                     
                     ingredient_demand_signals.append({
                         "ingredient": ingredient.get("name"),
@@ -525,8 +593,7 @@ def track_menu_item_demand(
                 demand_level = "Very Low"
             
             # Estimate trends (simplified)
-            active_ingredients = len([s for s in ingredient_demand_signals if s.get("has_recent_activity")])
-            trend_direction = "Increasing" if active_ingredients > len(ingredients) * 0.6 else "Stable" if active_ingredients > len(ingredients) * 0.3 else "Decreasing"
+            trend_direction = "Increasing" if active_count > len(ingredients) * 0.6 else "Stable" if active_count > len(ingredients) * 0.3 else "Decreasing"
             
             # Seasonal pattern placeholder (would need historical data)
             seasonal_pattern = "Requires historical data for accurate seasonal analysis"
@@ -544,9 +611,9 @@ def track_menu_item_demand(
                 },
                 "ingredient_analysis": {
                     "total_ingredients": len(ingredients),
-                    "tracked_ingredients": len([s for s in ingredient_demand_signals if s.get("inventory_match") != "Not found"]),
-                    "active_ingredients": active_ingredients,
-                    "low_stock_ingredients": len([s for s in ingredient_demand_signals if s.get("stock_status") == "low_stock"])
+                    "tracked_ingredients": tracked_count,
+                    "active_ingredients": active_count,
+                    "low_stock_ingredients": low_stock_count
                 },
                 "detailed_ingredient_signals": ingredient_demand_signals,
                 "recommendations": []
@@ -568,15 +635,16 @@ def track_menu_item_demand(
         demand_analysis.sort(key=lambda x: x["demand_metrics"]["demand_score"], reverse=True)
         
         # Summary insights
-        high_demand_items = len([item for item in demand_analysis if item["demand_metrics"]["demand_level"] == "High"])
+        demand_level_counts = Counter(item["demand_metrics"]["demand_level"] for item in demand_analysis)
+        high_demand_items = demand_level_counts["High"]
         total_items = len(demand_analysis)
         
         summary = {
             "analysis_period": f"Last {days_back} days pattern analysis",
             "total_items_analyzed": total_items,
             "high_demand_items": high_demand_items,
-            "medium_demand_items": len([item for item in demand_analysis if item["demand_metrics"]["demand_level"] == "Medium"]),
-            "low_demand_items": len([item for item in demand_analysis if item["demand_metrics"]["demand_level"] in ["Low", "Very Low"]]),
+            "medium_demand_items": demand_level_counts["Medium"],
+            "low_demand_items": demand_level_counts["Low"] + demand_level_counts["Very Low"],
             "overall_demand_health": "Good" if high_demand_items > total_items * 0.3 else "Average" if high_demand_items > 0 else "Needs Attention"
         }
         
@@ -589,7 +657,7 @@ def track_menu_item_demand(
             "source_endpoints": ["/api/v1/inventory", "/api/v1/cookbook"],
             "calculation_method": "Ingredient consumption pattern analysis for demand estimation",
             "data_freshness": "Real-time",
-            "generated_at": datetime.now().isoformat()
+            "generated_at": generated_at
         }
         
     except Exception as e:
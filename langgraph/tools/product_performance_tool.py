@@ -4,46 +4,150 @@ Real-time product performance using inventory, cookbook, and wastage data
 """
 
 from langchain_core.tools import tool
-import requests
-import os
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
-
-BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
-X_TENANT_ID = os.getenv("X_TENANT_ID", "11111111-1111-1111-1111-111111111111")
-X_LOCATION_ID = os.getenv("X_LOCATION_ID", "22222222-2222-2222-2222-222222222222")
-
-def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
-    """Helper function to make API calls with proper headers"""
-    url = f"{BASE_URL}{endpoint}"
-    headers = {
-        "X-Tenant-ID": X_TENANT_ID,
-        "Content-Type": "application/json"
-    }
+import asyncio
+import re
+import time
+import numpy as np
+from cachetools import LRUCache, TLRUCache
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime
+from collections import defaultdict
+from dataclasses import dataclass
+
+from ._api_client import make_api_call as api_call
+
+# Freshness window (seconds) per endpoint prefix for cached GET responses
+_CACHE_TTL_POLICY = {
+    "/api/v1/inventory": 10,
+    "/api/v1/cookbook": 60
+}
+_DEFAULT_CACHE_TTL = 15
+
+def _cache_ttl(key, value, now):
+    """Expiry time for a cached response, based on its endpoint"""
+    endpoint = key[0]
+    for prefix, ttl in _CACHE_TTL_POLICY.items():
+        if endpoint.startswith(prefix):
+            return now + ttl
+    return now + _DEFAULT_CACHE_TTL
+
+_CACHE = TLRUCache(maxsize=256, ttu=_cache_ttl)
+# Last good response per key, served when the backend is unavailable
+_STALE_CACHE = LRUCache(maxsize=256)
+
+async def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+    """Helper function to make API calls through the shared client, with per-endpoint freshness and stale fallback"""
+    return await api_call(endpoint, method, data, params=params, cache=_CACHE, stale_cache=_STALE_CACHE)
+
+# Inventory fields the performance scoring reads
+_INVENTORY_FIELDS = "name,has_recent_activity,stock_status,available_qty,price"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({"and", "the", "with", "for"})
+
+def _name_tokens(name: str) -> List[str]:
+    """Split a lowercased name into matchable tokens"""
+    return [token for token in _TOKEN_RE.findall(name) if len(token) >= 3 and token not in _STOPWORDS]
+
+def _build_ingredient_index(inventory_items: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+    """Build the exact-name lookup and token inverted index over inventory items"""
+    name_to_inv = {}
+    token_to_invs = defaultdict(list)
     
-    # Add location header for wastage endpoints
-    if "/wastage" in endpoint:
-        headers["X-Location-ID"] = X_LOCATION_ID
+    for inv_item in inventory_items:
+        inv_name = inv_item.get("name", "").lower()
+        name_to_inv[inv_name] = {
+            "has_activity": inv_item.get("has_recent_activity", False),
+            "stock_status": inv_item.get("stock_status", "unknown"),
+            "available_qty": float(inv_item.get("available_qty", 0)),
+            "price": float(inv_item.get("price", 0))
+        }
+        for token in _name_tokens(inv_name):
+            token_to_invs[token].append(inv_name)
     
-    try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data)
-        else:
-            raise ValueError(f"Unsupported method: {method}")
+    return name_to_inv, dict(token_to_invs)
+
+# Last inventory item list and the index built from it
+_ingredient_index_cache: Dict[str, Any] = {"inventory_items": None, "index": None}
+
+def _get_ingredient_index(inventory_items: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+    """Return the ingredient index, rebuilding it only when a new inventory payload arrives"""
+    # Cached responses hand back the same list object until their TTL expires
+    if _ingredient_index_cache["inventory_items"] is not inventory_items:
+        _ingredient_index_cache["index"] = _build_ingredient_index(inventory_items)
+        _ingredient_index_cache["inventory_items"] = inventory_items
+    return _ingredient_index_cache["index"]
+
+def _match_ingredient(ing_name: str, name_to_inv: Dict[str, Dict[str, Any]], token_to_invs: Dict[str, List[str]]) -> Optional[Dict[str, Any]]:
+    """Find the inventory entry for an ingredient: exact name first, then most shared tokens"""
+    if ing_name in name_to_inv:
+        return name_to_inv[ing_name]
+    
+    shared_tokens = defaultdict(int)
+    for token in set(_name_tokens(ing_name)):
+        for inv_name in token_to_invs.get(token, ()):
+            shared_tokens[inv_name] += 1
+    
+    if not shared_tokens:
+        return None
+    
+    # Most shared tokens wins; on ties prefer the shorter (more specific) name
+    best_match = max(shared_tokens, key=lambda inv_name: (shared_tokens[inv_name], -len(inv_name)))
+    return name_to_inv[best_match]
+
+def _resolve_ingredients(ingredients: List[Dict[str, Any]], name_to_inv: Dict[str, Dict[str, Any]], token_to_invs: Dict[str, List[str]]) -> Tuple[int, int, int, float]:
+    """Match recipe ingredients to inventory: (tracked, active, available, ingredient cost)"""
+    cost = 0
+    active_ingredients = 0
+    available_ingredients = 0
+    total_tracked_ingredients = 0
+    
+    for ingredient in ingredients:
+        ing_name = ingredient.get("name", "").lower()
+        
+        # Find matching inventory item
+        matching_ingredient = _match_ingredient(ing_name, name_to_inv, token_to_invs)
+        
+        if matching_ingredient:
+            total_tracked_ingredients += 1
+            cost += matching_ingredient["price"]
             
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {
-            "error": True,
-            "message": f"API call failed: {str(e)}",
-            "endpoint": endpoint
-        }
+            if matching_ingredient["has_activity"]:
+                active_ingredients += 1
+            
+            if matching_ingredient["stock_status"] in ["good_stock", "low_stock"]:
+                available_ingredients += 1
+    
+    return total_tracked_ingredients, active_ingredients, available_ingredients, cost
+
+# Last cookbook item list and the menu index built from it
+_menu_index_cache: Dict[str, Any] = {"cookbook_items": None, "index": None}
+
+def _get_menu_index(cookbook_items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """Return menu items and their lowercased-category buckets, rebuilt only for a new cookbook payload"""
+    if _menu_index_cache["cookbook_items"] is not cookbook_items:
+        menu_items = [item for item in cookbook_items if item.get("type") == "menu_item"]
+        by_category = defaultdict(list)
+        for item in menu_items:
+            by_category[item.get("category", "").lower()].append(item)
+        _menu_index_cache["index"] = (menu_items, dict(by_category))
+        _menu_index_cache["cookbook_items"] = cookbook_items
+    return _menu_index_cache["index"]
+
+@dataclass(slots=True)
+class _ProductPerf:
+    """Per-menu-item ingredient resolution, kept compact until the top N are serialized"""
+    name: str
+    category: str
+    price: float
+    total_ingredients: int
+    tracked_ingredients: int
+    active_ingredients: int
+    available_ingredients: int
+    ingredient_cost: float
 
 @tool
-def analyze_product_performance(
+async def analyze_product_performance(
     time_period: str = "current",
     metric: str = "overall",
     top_n: int = 10,
@@ -64,10 +168,18 @@ def analyze_product_performance(
         Real product performance analysis with comprehensive metrics
     """
     
+    generated_at_epoch = time.time()
+    
     try:
-        # Fetch real data from all sources
-        inventory_data = make_api_call("/api/v1/inventory")
-        cookbook_data = make_api_call("/api/v1/cookbook")
+        # Fetch real data from all sources concurrently, letting the backend trim
+        # what it can; filtering below still applies if it ignores these params
+        cookbook_params = {"type": "menu_item"}
+        if category:
+            cookbook_params["category"] = category
+        inventory_data, cookbook_data = await asyncio.gather(
+            make_api_call("/api/v1/inventory", params={"fields": _INVENTORY_FIELDS}),
+            make_api_call("/api/v1/cookbook", params=cookbook_params)
+        )
         
         if inventory_data.get("error") or cookbook_data.get("error"):
             return {
@@ -79,135 +191,112 @@ def analyze_product_performance(
         cookbook_items = cookbook_data.get("data", [])
         
         # Focus on menu items for product performance
-        menu_items = [item for item in cookbook_items if item.get("type") == "menu_item"]
+        menu_items, menu_items_by_category = _get_menu_index(cookbook_items)
         
         # Apply category filter if specified
         if category:
-            menu_items = [item for item in menu_items if item.get("category", "").lower() == category.lower()]
+            menu_items = menu_items_by_category.get(category.lower(), [])
         
         # Create ingredient lookup for performance correlation
-        ingredient_lookup = {}
-        for inv_item in inventory_items:
-            ingredient_lookup[inv_item.get("name", "").lower()] = {
-                "has_activity": inv_item.get("has_recent_activity", False),
-                "stock_status": inv_item.get("stock_status", "unknown"),
-                "available_qty": float(inv_item.get("available_qty", 0)),
-                "price": float(inv_item.get("price", 0))
-            }
+        name_to_inv, token_to_invs = _get_ingredient_index(inventory_items)
         
-        # Analyze performance for each menu item
-        product_performance = []
+        # Resolve ingredients for each menu item
+        products = []
         
         for menu_item in menu_items:
-            menu_name = menu_item.get("name", "")
-            menu_price = float(menu_item.get("price", 0))
-            menu_category = menu_item.get("category", "uncategorized")
             recipe = menu_item.get("recipe", {})
             ingredients = recipe.get("ingredients", [])
             
-            # Performance metrics calculation
-            performance_metrics = {
-                "revenue_potential": menu_price,
-                "ingredient_activity_score": 0,
-                "availability_score": 0,
-                "cost_efficiency_score": 0,
-                "overall_performance_score": 0
-            }
-            
             # Analyze ingredient performance
-            ingredient_costs = 0
-            active_ingredients = 0
-            available_ingredients = 0
-            total_tracked_ingredients = 0
-            
-            for ingredient in ingredients:
-                ing_name = ingredient.get("name", "").lower()
-                
-                # Find matching inventory item
-                matching_ingredient = None
-                for inv_name, inv_data in ingredient_lookup.items():
-                    if ing_name in inv_name or inv_name in ing_name:
-                        matching_ingredient = inv_data
-                        total_tracked_ingredients += 1
-                        break
-                
-                if matching_ingredient:
-                    ingredient_costs += matching_ingredient["price"]
-                    
-                    if matching_ingredient["has_activity"]:
-                        active_ingredients += 1
-                    
-                    if matching_ingredient["stock_status"] in ["good_stock", "low_stock"]:
-                        available_ingredients += 1
-            
-            # Calculate performance scores
-            if len(ingredients) > 0:
-                performance_metrics["ingredient_activity_score"] = (active_ingredients / len(ingredients)) * 100
-                performance_metrics["availability_score"] = (available_ingredients / len(ingredients)) * 100
-            
-            # Cost efficiency (profit margin estimation)
-            if menu_price > 0:
-                estimated_profit_margin = ((menu_price - ingredient_costs) / menu_price) * 100
-                performance_metrics["cost_efficiency_score"] = max(0, min(100, estimated_profit_margin))
-            
-            # Overall performance score (weighted average)
-            performance_metrics["overall_performance_score"] = (
-                performance_metrics["ingredient_activity_score"] * 0.4 +
-                performance_metrics["availability_score"] * 0.3 +
-                performance_metrics["cost_efficiency_score"] * 0.3
+            total_tracked_ingredients, active_ingredients, available_ingredients, cost = _resolve_ingredients(
+                ingredients, name_to_inv, token_to_invs
             )
             
-            # Performance classification
-            overall_score = performance_metrics["overall_performance_score"]
-            if overall_score >= 75:
-                performance_rating = "Excellent"
-            elif overall_score >= 60:
-                performance_rating = "Good"
-            elif overall_score >= 40:
-                performance_rating = "Average"
-            else:
-                performance_rating = "Needs Improvement"
-            
-            product_analysis = {
-                "product_name": menu_name,
-                "category": menu_category,
-                "price": menu_price,
-                "performance_metrics": performance_metrics,
-                "performance_rating": performance_rating,
-                "ingredient_analysis": {
-                    "total_ingredients": len(ingredients),
-                    "tracked_ingredients": total_tracked_ingredients,
-                    "active_ingredients": active_ingredients,
-                    "available_ingredients": available_ingredients,
-                    "estimated_ingredient_cost": round(ingredient_costs, 2)
-                },
-                "business_insights": {
-                    "estimated_profit": round(menu_price - ingredient_costs, 2),
-                    "profit_margin_percentage": round(performance_metrics["cost_efficiency_score"], 2)
-                }
-            }
-            
-            product_performance.append(product_analysis)
+            products.append(_ProductPerf(
+                name=menu_item.get("name", ""),
+                category=menu_item.get("category", "uncategorized"),
+                price=float(menu_item.get("price", 0)),
+                total_ingredients=len(ingredients),
+                tracked_ingredients=total_tracked_ingredients,
+                active_ingredients=active_ingredients,
+                available_ingredients=available_ingredients,
+                ingredient_cost=cost
+            ))
+        
+        # Calculate performance scores across all products at once
+        total_products = len(products)
+        price_arr = np.fromiter((p.price for p in products), dtype=np.float64, count=total_products)
+        cost_arr = np.fromiter((p.ingredient_cost for p in products), dtype=np.float64, count=total_products)
+        count_arr = np.fromiter((p.total_ingredients for p in products), dtype=np.float64, count=total_products)
+        active_arr = np.fromiter((p.active_ingredients for p in products), dtype=np.float64, count=total_products)
+        available_arr = np.fromiter((p.available_ingredients for p in products), dtype=np.float64, count=total_products)
+        safe_counts = np.where(count_arr > 0, count_arr, 1)
+        
+        activity_scores = np.where(count_arr > 0, active_arr / safe_counts * 100, 0.0)
+        availability_scores = np.where(count_arr > 0, available_arr / safe_counts * 100, 0.0)
+        
+        # Cost efficiency (profit margin estimation)
+        safe_prices = np.where(price_arr > 0, price_arr, 1)
+        efficiency_scores = np.where(price_arr > 0, np.clip((price_arr - cost_arr) / safe_prices * 100, 0, 100), 0.0)
+        
+        # Overall performance score (weighted average)
+        overall_scores = activity_scores * 0.4 + availability_scores * 0.3 + efficiency_scores * 0.3
+        
+        # Performance classification
+        excellent_mask = overall_scores >= 75
+        good_or_better_mask = overall_scores >= 60
+        ratings = np.select(
+            [excellent_mask, good_or_better_mask, overall_scores >= 40],
+            ["Excellent", "Good", "Average"],
+            default="Needs Improvement"
+        )
         
         # Sort by selected metric
         if metric == "revenue":
-            product_performance.sort(key=lambda x: x["price"], reverse=True)
+            sort_values = price_arr
         elif metric == "activity":
-            product_performance.sort(key=lambda x: x["performance_metrics"]["ingredient_activity_score"], reverse=True)
+            sort_values = activity_scores
         elif metric == "efficiency":
-            product_performance.sort(key=lambda x: x["performance_metrics"]["cost_efficiency_score"], reverse=True)
+            sort_values = efficiency_scores
         else:  # overall
-            product_performance.sort(key=lambda x: x["performance_metrics"]["overall_performance_score"], reverse=True)
+            sort_values = overall_scores
         
-        # Get top N products
-        top_products = product_performance[:top_n]
+        # Get top N products, building result records only for those.
+        # Stable sort so products tied at the cut-off keep their catalog order.
+        top_indices = np.argsort(-sort_values, kind="stable")[:top_n]
+        top_products = []
+        for i in top_indices:
+            product = products[i]
+            top_products.append({
+                "product_name": product.name,
+                "category": product.category,
+                "price": product.price,
+                "performance_metrics": {
+                    "revenue_potential": product.price,
+                    "ingredient_activity_score": float(activity_scores[i]),
+                    "availability_score": float(availability_scores[i]),
+                    "cost_efficiency_score": float(efficiency_scores[i]),
+                    "overall_performance_score": float(overall_scores[i])
+                },
+                "performance_rating": str(ratings[i]),
+                "ingredient_analysis": {
+                    "total_ingredients": product.total_ingredients,
+                    "tracked_ingredients": product.tracked_ingredients,
+                    "active_ingredients": product.active_ingredients,
+                    "available_ingredients": product.available_ingredients,
+                    "estimated_ingredient_cost": round(product.ingredient_cost, 2)
+                },
+                "business_insights": {
+                    "estimated_profit": round(product.price - product.ingredient_cost, 2),
+                    "profit_margin_percentage": round(float(efficiency_scores[i]), 2)
+                }
+            })
         
         # Calculate summary statistics
-        total_products = len(product_performance)
-        avg_performance_score = sum(p["performance_metrics"]["overall_performance_score"] for p in product_performance) / total_products if total_products > 0 else 0
+        avg_performance_score = float(overall_scores.mean()) if total_products > 0 else 0
         
-        excellent_products = len([p for p in product_performance if p["performance_rating"] == "Excellent"])
-        good_products = len([p for p in product_performance if p["performance_rating"] == "Good"])
+        excellent_products = int(np.count_nonzero(excellent_mask))
+        good_products = int(np.count_nonzero(good_or_better_mask)) - excellent_products
         
         analysis_result = {
             "analysis_period": time_period,
@@ -236,7 +325,7 @@ def analyze_product_performance(
             "source_endpoints": ["/api/v1/inventory", "/api/v1/cookbook"],
             "calculation_method": "Multi-factor performance scoring using real data correlations",
             "data_freshness": "Real-time",
-            "generated_at": datetime.now().isoformat()
+            "generated_at": datetime.fromtimestamp(generated_at_epoch).isoformat()
         }
         
     except Exception as e:
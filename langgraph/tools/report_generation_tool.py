@@ -4,46 +4,27 @@ Comprehensive reporting using real data from inventory, cookbook, sales, and was
 """
 
 from langchain_core.tools import tool
-import requests
-import os
+import asyncio
+import numpy as np
+from cachetools import TTLCache
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
+from collections import Counter
 
-BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
-X_TENANT_ID = os.getenv("X_TENANT_ID", "11111111-1111-1111-1111-111111111111")
-X_LOCATION_ID = os.getenv("X_LOCATION_ID", "22222222-2222-2222-2222-222222222222")
+from ._api_client import make_api_call as api_call
 
-def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
-    """Helper function to make API calls with proper headers"""
-    url = f"{BASE_URL}{endpoint}"
-    headers = {
-        "X-Tenant-ID": X_TENANT_ID,
-        "Content-Type": "application/json"
-    }
-    
-    # Add location header for wastage endpoints
-    if "/wastage" in endpoint:
-        headers["X-Location-ID"] = X_LOCATION_ID
-    
-    try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data)
-        else:
-            raise ValueError(f"Unsupported method: {method}")
-            
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {
-            "error": True,
-            "message": f"API call failed: {str(e)}",
-            "endpoint": endpoint
-        }
+# Currency formatter shared by report highlights
+_money = "${:,.2f}".format
+
+# Short-lived GET response cache shared by the report tools
+_CACHE = TTLCache(maxsize=32, ttl=30)
+
+async def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
+    """Helper function to make API calls through the shared client, reusing GET responses briefly"""
+    return await api_call(endpoint, method, data, cache=_CACHE)
 
 @tool
-def generate_comprehensive_business_report(
+async def generate_comprehensive_business_report(
     report_type: str = "executive_summary",
     include_forecasts: bool = True,
     include_recommendations: bool = True
@@ -61,10 +42,12 @@ def generate_comprehensive_business_report(
     """
     
     try:
-        # Gather data from all sources
-        inventory_data = make_api_call("/api/v1/inventory")
-        cookbook_data = make_api_call("/api/v1/cookbook")
-        wastage_data = make_api_call("/api/v1/wastage/summary")
+        # Gather data from all sources concurrently
+        inventory_data, cookbook_data, wastage_data = await asyncio.gather(
+            make_api_call("/api/v1/inventory"),
+            make_api_call("/api/v1/cookbook"),
+            make_api_call("/api/v1/wastage/summary")
+        )
         
         if inventory_data.get("error") or cookbook_data.get("error"):
             return {
@@ -76,48 +59,73 @@ def generate_comprehensive_business_report(
         inventory_items = inventory_data.get("ingredient_items", [])
         cookbook_items = cookbook_data.get("data", [])
         menu_items = [item for item in cookbook_items if item.get("type") == "menu_item"]
+        n_inv = len(inventory_items)
+        n_menu = len(menu_items)
+        
+        # Project inventory rows into columns in a single pass
+        if n_inv:
+            prices, quantities, statuses, active_flags, names = zip(*(
+                (
+                    float(item.get("price", 0)),
+                    float(item.get("available_qty", 0)),
+                    item.get("stock_status", "unknown"),
+                    bool(item.get("has_recent_activity")),
+                    item.get("name", "").lower()
+                )
+                for item in inventory_items
+            ))
+        else:
+            prices = quantities = statuses = active_flags = names = ()
         
         # Calculate key metrics
-        total_inventory_value = sum(
-            float(item.get("price", 0)) * float(item.get("available_qty", 0))
-            for item in inventory_items
-        )
+        total_inventory_value = float(np.dot(
+            np.array(prices, dtype=np.float64),
+            np.array(quantities, dtype=np.float64)
+        ))
         
-        total_menu_value = sum(float(item.get("price", 0)) for item in menu_items)
-        active_inventory_items = len([item for item in inventory_items if item.get("has_recent_activity")])
+        menu_prices = np.fromiter(
+            (float(item.get("price", 0)) for item in menu_items),
+            dtype=np.float64, count=n_menu
+        )
+        total_menu_value = float(menu_prices.sum())
+        active_inventory_items = sum(active_flags)
         
         # Status breakdown
-        status_counts = {}
-        for item in inventory_items:
-            status = item.get("stock_status", "unknown")
-            status_counts[status] = status_counts.get(status, 0) + 1
+        status_counts = Counter(statuses)
         
-        # Estimated sales activity (cross-dataset analysis)
-        estimated_daily_revenue = 0
+        # Only active inventory items count towards ingredient activity
+        active_inventory_names = [name for name, active in zip(names, active_flags) if active]
+        
+        # Ingredients recur across menu items; lowercase and match each name once
+        ingredient_activity = {}
         for menu_item in menu_items:
-            menu_price = float(menu_item.get("price", 0))
-            recipe = menu_item.get("recipe", {})
-            ingredients = recipe.get("ingredients", [])
-            
-            # Check if ingredients show activity
-            has_active_ingredients = False
-            for ingredient in ingredients:
-                ing_name = ingredient.get("name", "").lower()
-                for inv_item in inventory_items:
-                    if ing_name in inv_item.get("name", "").lower() and inv_item.get("has_recent_activity"):
-                        has_active_ingredients = True
-                        break
-                if has_active_ingredients:
-                    break
-            
-            if has_active_ingredients:
-                estimated_daily_revenue += menu_price * 3  # Simplified multiplier
+            for ingredient in menu_item.get("recipe", {}).get("ingredients", []):
+                ing_name = ingredient.get("name", "")
+                if ing_name not in ingredient_activity:
+                    ing_lower = ing_name.lower()
+                    ingredient_activity[ing_name] = any(ing_lower in name for name in active_inventory_names)
+        
+        # Estimated sales activity (cross-dataset analysis):
+        # menu items with any active ingredient count at a simplified 3x multiplier
+        menu_active = np.fromiter(
+            (
+                any(
+                    ingredient_activity[ingredient.get("name", "")]
+                    for ingredient in menu_item.get("recipe", {}).get("ingredients", [])
+                )
+                for menu_item in menu_items
+            ),
+            dtype=bool, count=n_menu
+        )
+        estimated_daily_revenue = float(menu_prices[menu_active].sum()) * 3
         
         # Wastage impact
         wastage_cost = 0
         if not wastage_data.get("error"):
             wastage_cost = float(wastage_data.get("total_cost", 0))
         
+        revenue_display = _money(estimated_daily_revenue)
+        
         # Generate report
         report = {
             "executive_summary": {
@@ -125,29 +133,29 @@ def generate_comprehensive_business_report(
                 "reporting_period": datetime.now().strftime("%Y-%m-%d"),
                 "key_metrics": {
                     "total_inventory_value": round(total_inventory_value, 2),
-                    "total_menu_items": len(menu_items),
+                    "total_menu_items": n_menu,
                     "estimated_daily_revenue": round(estimated_daily_revenue, 2),
-                    "inventory_activity_rate": round((active_inventory_items / len(inventory_items) * 100), 2) if inventory_items else 0,
+                    "inventory_activity_rate": round((active_inventory_items / n_inv * 100), 2) if n_inv else 0,
                     "wastage_cost": round(wastage_cost, 2)
                 },
                 "business_highlights": [
-                    f"${total_inventory_value:,.2f} total inventory investment",
-                    f"{len(menu_items)} menu items generating ${estimated_daily_revenue:,.2f} estimated daily revenue",
-                    f"{active_inventory_items}/{len(inventory_items)} inventory items showing activity",
+                    f"{_money(total_inventory_value)} total inventory investment",
+                    f"{n_menu} menu items generating {revenue_display} estimated daily revenue",
+                    f"{active_inventory_items}/{n_inv} inventory items showing activity",
                     f"${wastage_cost:.2f} in wastage costs requiring attention" if wastage_cost > 50 else "Wastage costs under control"
                 ]
             },
             "operational_overview": {
                 "inventory_status": {
-                    "total_items": len(inventory_items),
+                    "total_items": n_inv,
                     "status_breakdown": status_counts,
                     "critical_items": status_counts.get("out_of_stock", 0),
                     "items_needing_attention": status_counts.get("low_stock", 0) + status_counts.get("out_of_stock", 0)
                 },
                 "menu_portfolio": {
-                    "total_menu_items": len(menu_items),
-                    "average_price": round(total_menu_value / len(menu_items), 2) if menu_items else 0,
-                    "estimated_daily_activity": f"${estimated_daily_revenue:,.2f}"
+                    "total_menu_items": n_menu,
+                    "average_price": round(total_menu_value / n_menu, 2) if n_menu else 0,
+                    "estimated_daily_activity": revenue_display
                 }
             },
             "financial_insights": {
@@ -176,7 +184,7 @@ def generate_comprehensive_business_report(
                 },
                 "inventory_projections": {
                     "reorder_requirements": status_counts.get("low_stock", 0) + status_counts.get("out_of_stock", 0),
-                    "activity_trend": "Increasing" if active_inventory_items > len(inventory_items) * 0.5 else "Stable"
+                    "activity_trend": "Increasing" if active_inventory_items > n_inv * 0.5 else "Stable"
                 }
             }
         
@@ -237,7 +245,7 @@ def generate_comprehensive_business_report(
         }
 
 @tool
-def generate_inventory_status_report(
+async def generate_inventory_status_report(
     include_forecasting: bool = True
 ) -> Dict[str, Any]:
     """
@@ -251,7 +259,7 @@ def generate_inventory_status_report(
     """
     
     try:
-        inventory_data = make_api_call("/api/v1/inventory")
+        inventory_data = await make_api_call("/api/v1/inventory")
         
         if inventory_data.get("error"):
             return {
@@ -260,44 +268,57 @@ def generate_inventory_status_report(
             }
         
         inventory_items = inventory_data.get("ingredient_items", [])
+        total_items = len(inventory_items)
         
         # Status analysis
         status_summary = {}
         total_value = 0
         critical_items = []
+        critical_count = 0
+        high_count = 0
         
         for item in inventory_items:
             status = item.get("stock_status", "unknown")
             status_summary[status] = status_summary.get(status, 0) + 1
             total_value += float(item.get("price", 0)) * float(item.get("available_qty", 0))
             
-            if status in ["out_of_stock", "low_stock"]:
-                critical_items.append({
-                    "name": item.get("name"),
-                    "status": status,
-                    "quantity": item.get("available_qty"),
-                    "unit": item.get("unit", ""),
-                    "priority": "Critical" if status == "out_of_stock" else "High"
-                })
+            if status == "out_of_stock":
+                priority = "Critical"
+                critical_count += 1
+            elif status == "low_stock":
+                priority = "High"
+                high_count += 1
+            else:
+                continue
+            
+            critical_items.append({
+                "name": item.get("name"),
+                "status": status,
+                "quantity": item.get("available_qty"),
+                "unit": item.get("unit", ""),
+                "priority": priority
+            })
+        
+        attention_count = critical_count + high_count
         
         report = {
             "inventory_overview": {
-                "total_items": len(inventory_items),
+                "total_items": total_items,
                 "total_inventory_value": round(total_value, 2),
-                "average_item_value": round(total_value / len(inventory_items), 2) if inventory_items else 0,
+                "average_item_value": round(total_value / total_items, 2) if total_items else 0,
                 "status_distribution": status_summary
             },
             "alerts_and_actions": {
-                "critical_items_count": len(critical_items),
+                "critical_items_count": attention_count,
                 "critical_items": critical_items[:10],  # Top 10 critical items
-                "immediate_actions_needed": len([item for item in critical_items if item["priority"] == "Critical"]),
-                "procurement_planning_needed": len([item for item in critical_items if item["priority"] == "High"])
+                "immediate_actions_needed": critical_count,
+                "procurement_planning_needed": high_count
             },
             "inventory_health": {
-                "health_score": round(((status_summary.get("good_stock", 0) / len(inventory_items)) * 100), 2) if inventory_items else 0,
+                "health_score": round(((status_summary.get("good_stock", 0) / total_items) * 100), 2) if total_items else 0,
                 "items_in_good_condition": status_summary.get("good_stock", 0),
-                "items_needing_attention": len(critical_items),
-                "overall_status": "Healthy" if len(critical_items) < len(inventory_items) * 0.1 else "Needs Attention"
+                "items_needing_attention": attention_count,
+                "overall_status": "Healthy" if attention_count < total_items * 0.1 else "Needs Attention"
             }
         }
         
@@ -4,49 +4,39 @@ Cross-dataset analysis using inventory + cookbook + wastage data to derive sales
 """
 
 from langchain_core.tools import tool
-import requests
-import os
+import asyncio
+import httpx
+import numpy as np
+from cachetools import TTLCache
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
+from collections import defaultdict
+from heapq import nlargest
+from operator import itemgetter
+from dataclasses import dataclass
 import json
 
-BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
-X_TENANT_ID = os.getenv("X_TENANT_ID", "11111111-1111-1111-1111-111111111111")
-X_LOCATION_ID = os.getenv("X_LOCATION_ID", "22222222-2222-2222-2222-222222222222")
+from ._api_client import CLIENT, make_api_call, request_headers
 
-def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
-    """Helper function to make API calls with proper headers"""
-    url = f"{BASE_URL}{endpoint}"
-    headers = {
-        "X-Tenant-ID": X_TENANT_ID,
-        "Content-Type": "application/json"
-    }
-    
-    # Add location header for wastage endpoints
-    if "/wastage" in endpoint:
-        headers["X-Location-ID"] = X_LOCATION_ID
-    
+async def _endpoint_exists(endpoint: str) -> bool:
+    """Helper function to probe an endpoint without downloading its body"""
     try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data)
-        else:
-            raise ValueError(f"Unsupported method: {method}")
-            
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {
-            "error": True,
-            "message": f"API call failed: {str(e)}",
-            "endpoint": endpoint
-        }
+        response = await CLIENT.head(endpoint, headers=request_headers(endpoint), timeout=3.0)
+        return response.status_code != 404
+    except httpx.HTTPError:
+        return False
+
+# The backend's endpoint surface is static for the life of the process
+_DISCOVERY_CACHE = TTLCache(maxsize=1, ttl=300)
 
-def discover_sales_endpoints() -> List[str]:
+async def discover_sales_endpoints() -> List[str]:
     """
     Discover if any undocumented sales endpoints exist
     """
+    cached = _DISCOVERY_CACHE.get("sales")
+    if cached is not None:
+        return cached
+    
     potential_sales_endpoints = [
         "/api/v1/sales",
         "/api/v1/sales/total-sales", 
@@ -55,21 +45,48 @@ def discover_sales_endpoints() -> List[str]:
         "/api/v1/transactions"
     ]
     
-    available_endpoints = []
-    for endpoint in potential_sales_endpoints:
-        try:
-            response = requests.get(f"{BASE_URL}{endpoint}", 
-                                  headers={"X-Tenant-ID": X_TENANT_ID}, 
-                                  timeout=3)
-            if response.status_code != 404:
-                available_endpoints.append(endpoint)
-        except:
-            pass
+    # Probe all candidates concurrently; gather keeps the priority order
+    exists = await asyncio.gather(*(_endpoint_exists(endpoint) for endpoint in potential_sales_endpoints))
     
+    available_endpoints = [endpoint for endpoint, found in zip(potential_sales_endpoints, exists) if found]
+    # An empty result may just be a transient outage, so probe again next time
+    if available_endpoints:
+        _DISCOVERY_CACHE["sales"] = available_endpoints
     return available_endpoints
 
+def _items_to_columns(items: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Helper function to project inventory items into per-field columns"""
+    return {
+        "name": np.array([item.get("name") for item in items], dtype=object),
+        "name_lower": np.array([item.get("name", "").lower() for item in items], dtype=object),
+        "stock_status": np.array([item.get("stock_status") for item in items], dtype=object),
+        "has_recent_activity": np.fromiter(
+            (bool(item.get("has_recent_activity")) for item in items),
+            dtype=bool, count=len(items)
+        )
+    }
+
+@dataclass(slots=True)
+class _HighTurnoverItem:
+    """One inventory-to-menu sales match, kept compact until the top 10 are serialized"""
+    name: Optional[str]
+    menu_item: str
+    estimated_revenue: float
+    status: str
+
+# Columns of the last inventory payload seen, keyed by list identity
+_columns_cache = {"inventory_items": None, "columns": None}
+
+def _get_inventory_columns(inventory_items: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Return inventory columns, re-projected only when a new inventory payload arrives"""
+    # ETag revalidation hands back the same list object while inventory is unchanged
+    if _columns_cache["inventory_items"] is not inventory_items:
+        _columns_cache["columns"] = _items_to_columns(inventory_items)
+        _columns_cache["inventory_items"] = inventory_items
+    return _columns_cache["columns"]
+
 @tool
-def get_total_sales(
+async def get_total_sales(
     date_range: str = "today",
     include_forecasting: bool = False
 ) -> Dict[str, Any]:
@@ -84,14 +101,17 @@ def get_total_sales(
         Sales analysis calculated from inventory movements + cookbook pricing
     """
     
+    # One timestamp per logical query, shared by every result shape below
+    generated_at = datetime.now().isoformat()
+    
     try:
         # First, check if direct sales endpoints exist
-        sales_endpoints = discover_sales_endpoints()
+        sales_endpoints = await discover_sales_endpoints()
         
         if sales_endpoints:
             # Try direct sales endpoint first
             for endpoint in sales_endpoints:
-                sales_data = make_api_call(endpoint)
+                sales_data = await make_api_call(endpoint)
                 if not sales_data.get("error"):
                     return {
                         "success": True,
@@ -100,12 +120,16 @@ def get_total_sales(
                         "confidence": "High - Real sales data",
                         "source_endpoints": [endpoint],
                         "data_freshness": "Real-time",
-                        "generated_at": datetime.now().isoformat()
+                        "generated_at": generated_at
                     }
         
         # Fallback: Cross-dataset analysis
-        # Fetch inventory data
-        inventory_data = make_api_call("/api/v1/inventory")
+        # Fetch inventory and cookbook data concurrently
+        inventory_data, cookbook_data = await asyncio.gather(
+            make_api_call("/api/v1/inventory"),
+            make_api_call("/api/v1/cookbook")
+        )
+        
         if inventory_data.get("error"):
             return {
                 "error": True,
@@ -113,8 +137,6 @@ def get_total_sales(
                 "endpoints_tried": ["/api/v1/inventory"]
             }
         
-        # Fetch cookbook data
-        cookbook_data = make_api_call("/api/v1/cookbook")
         if cookbook_data.get("error"):
             return {
                 "error": True,
@@ -125,12 +147,11 @@ def get_total_sales(
         # Extract data
         inventory_items = inventory_data.get("ingredient_items", [])
         cookbook_items = cookbook_data.get("data", [])
+        n_items = len(inventory_items)
         
         # Calculate sales indicators from inventory movements
-        total_revenue_estimate = 0
-        items_with_activity = 0
-        high_turnover_items = []
-        category_sales = {}
+        matched_rows = []
+        matched_menus = []
         
         # Create pricing lookup from cookbook
         menu_pricing = {}
@@ -142,36 +163,55 @@ def get_total_sales(
                     "id": item.get("id", "")
                 }
         
+        # Index menu items by name token, keeping each menu's cookbook position
+        menu_order = {menu_name: position for position, menu_name in enumerate(menu_pricing)}
+        menu_token_index = defaultdict(set)
+        for menu_name in menu_pricing:
+            for token in menu_name.split():
+                menu_token_index[token].add(menu_name)
+        
         # Analyze inventory for sales indicators
-        for item in inventory_items:
-            if item.get("has_recent_activity"):
-                items_with_activity += 1
-                item_name = item.get("name", "").lower()
-                
-                # If this ingredient is used in menu items, estimate sales
-                for menu_name, menu_info in menu_pricing.items():
-                    # Simple matching (could be improved with recipe analysis)
-                    if item_name in menu_name or any(word in item_name for word in menu_name.split()):
-                        # Estimate sales based on activity and stock levels
-                        if item.get("stock_status") == "low_stock":
-                            # High usage indicates sales
-                            estimated_portions = 10  # Simplified estimation
-                            estimated_revenue = estimated_portions * menu_info["price"]
-                            total_revenue_estimate += estimated_revenue
-                            
-                            # Track category
-                            category = menu_info["category"]
-                            if category not in category_sales:
-                                category_sales[category] = {"revenue": 0, "items": 0}
-                            category_sales[category]["revenue"] += estimated_revenue
-                            category_sales[category]["items"] += 1
-                            
-                            high_turnover_items.append({
-                                "name": item.get("name"),
-                                "menu_item": menu_name,
-                                "estimated_revenue": estimated_revenue,
-                                "status": item.get("stock_status")
-                            })
+        columns = _get_inventory_columns(inventory_items)
+        names, name_lower, stock_status = columns["name"], columns["name_lower"], columns["stock_status"]
+        active_mask = columns["has_recent_activity"]
+        items_with_activity = int(active_mask.sum())
+        
+        # Estimate sales based on activity and stock levels: only active
+        # low-stock rows can contribute, so mask the rest out before matching
+        sales_rows = np.flatnonzero(active_mask & (stock_status == "low_stock"))
+        
+        for row in sales_rows.tolist():
+            # If this ingredient is used in menu items, estimate sales
+            # Simple matching on shared name tokens (could be improved with recipe analysis)
+            candidates = set()
+            for token in name_lower[row].split():
+                candidates.update(menu_token_index.get(token, ()))
+            
+            for menu_name in sorted(candidates, key=menu_order.__getitem__):
+                matched_rows.append(row)
+                matched_menus.append(menu_name)
+        
+        # High usage indicates sales: price every matched menu item in one vector pass
+        estimated_portions = 10  # Simplified estimation
+        match_revenue = estimated_portions * np.fromiter(
+            (menu_pricing[menu_name]["price"] for menu_name in matched_menus),
+            dtype=np.float64, count=len(matched_menus)
+        )
+        total_revenue_estimate = float(match_revenue.sum())
+        
+        # Track category: factorize in first-seen order, then total with bincount
+        category_codes = {}
+        match_categories = np.fromiter(
+            (category_codes.setdefault(menu_pricing[menu_name]["category"], len(category_codes)) for menu_name in matched_menus),
+            dtype=np.intp, count=len(matched_menus)
+        )
+        category_revenue = np.bincount(match_categories, weights=match_revenue, minlength=len(category_codes))
+        category_items = np.bincount(match_categories, minlength=len(category_codes))
+        
+        high_turnover_items = [
+            _HighTurnoverItem(names[row], menu_name, estimated_revenue, stock_status[row])
+            for row, menu_name, estimated_revenue in zip(matched_rows, matched_menus, match_revenue.tolist())
+        ]
         
         # Calculate date range specifics
         if date_range == "today":
@@ -194,7 +234,11 @@ def get_total_sales(
         avg_revenue_per_active_item = total_revenue_estimate / items_with_activity if items_with_activity > 0 else 0
         
         # Top categories by estimated revenue
-        top_categories = sorted(category_sales.items(), key=lambda x: x[1]["revenue"], reverse=True)[:5]
+        top_categories = nlargest(
+            5,
+            zip(category_codes, category_revenue.tolist(), category_items.tolist()),
+            key=itemgetter(1)
+        )
         
         sales_analysis = {
             "period": analysis_period,
@@ -207,24 +251,32 @@ def get_total_sales(
             "category_performance": [
                 {
                     "category": category,
-                    "estimated_revenue": round(data["revenue"], 2),
-                    "active_items": data["items"],
-                    "percentage_of_total": round((data["revenue"] / total_revenue_estimate * 100), 2) if total_revenue_estimate > 0 else 0
+                    "estimated_revenue": round(revenue, 2),
+                    "active_items": items,
+                    "percentage_of_total": round((revenue / total_revenue_estimate * 100), 2) if total_revenue_estimate > 0 else 0
+                }
+                for category, revenue, items in top_categories
+            ],
+            "high_performance_items": [
+                {
+                    "name": entry.name,
+                    "menu_item": entry.menu_item,
+                    "estimated_revenue": entry.estimated_revenue,
+                    "status": entry.status
                 }
-                for category, data in top_categories
+                for entry in high_turnover_items[:10]
             ],
-            "high_performance_items": high_turnover_items[:10],
             "insights": []
         }
         
         # Add insights based on analysis
-        if items_with_activity > len(inventory_items) * 0.3:
+        if items_with_activity > n_items * 0.3:
             sales_analysis["insights"].append("High inventory turnover indicates strong sales activity")
         
         if len(high_turnover_items) > 5:
             sales_analysis["insights"].append("Multiple high-turnover items detected - busy sales period")
         
-        if top_categories and top_categories[0][1]["revenue"] > total_revenue_estimate * 0.5:
+        if top_categories and top_categories[0][1] > total_revenue_estimate * 0.5:
             sales_analysis["insights"].append(f"'{top_categories[0][0]}' category dominates sales")
         
         # Include forecasting if requested
@@ -232,7 +284,7 @@ def get_total_sales(
         if include_forecasting:
             # Simple trend forecasting based on current activity
             if items_with_activity > 0:
-                growth_factor = min(items_with_activity / len(inventory_items), 0.2)  # Cap at 20% growth
+                growth_factor = min(items_with_activity / n_items, 0.2)  # Cap at 20% growth
                 forecasting_data = {
                     "next_period_estimate": round(total_revenue_estimate * (1 + growth_factor), 2),
                     "growth_indicator": f"{growth_factor * 100:.1f}%",
@@ -253,7 +305,7 @@ def get_total_sales(
                 "Direct sales endpoints not available"
             ],
             "data_freshness": "Real-time",
-            "generated_at": datetime.now().isoformat()
+            "generated_at": generated_at
         }
         
     except Exception as e:
@@ -4,39 +4,17 @@ Handles read-only inventory queries for analysis purposes
 """
 
 from langchain_core.tools import tool
-import requests
-import os
-from typing import Optional, Dict, Any
+from typing import Dict, Any
 from datetime import datetime
 
-BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
-X_TENANT_ID = os.getenv("X_TENANT_ID", "11111111-1111-1111-1111-111111111111")
+# Read-only analysis: only GET calls go out through the shared client
+from ._api_client import api_get as make_api_call
 
-def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
-    """Helper function to make API calls with proper headers"""
-    url = f"{BASE_URL}{endpoint}"
-    headers = {
-        "X-Tenant-ID": X_TENANT_ID,
-        "Content-Type": "application/json"
-    }
-    
-    try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        else:
-            raise ValueError(f"Only GET requests allowed for analysis - attempted: {method}")
-            
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {
-            "error": True,
-            "message": f"API call failed: {str(e)}",
-            "endpoint": endpoint
-        }
+# Characters that would turn /api/v1/inventory/{id} into a different URL
+_INVALID_ID_CHARS = frozenset("/?#")
 
 @tool
-def get_product_details(
+async def get_product_details(
     product_id: str
 ) -> Dict[str, Any]:
     """
@@ -49,15 +27,26 @@ def get_product_details(
         Detailed product information from inventory
     """
     
+    # Reject ids that cannot address a single item before paying for a round trip
+    product_id = product_id.strip()
+    if not product_id or not _INVALID_ID_CHARS.isdisjoint(product_id):
+        return {
+            "error": True,
+            "validation_error": True,
+            "message": f"Invalid product_id: {product_id!r}",
+            "tool": "get_product_details"
+        }
+    
     try:
         # Get specific product inventory data
-        inventory_data = make_api_call(f"/api/v1/inventory/{product_id}")
+        endpoint = f"/api/v1/inventory/{product_id}"
+        inventory_data = await make_api_call(endpoint)
         
         if inventory_data.get("error"):
             return {
                 "error": True,
                 "message": f"Unable to connect to backend server: {inventory_data.get('message')}",
-                "endpoint": f"/api/v1/inventory/{product_id}",
+                "endpoint": endpoint,
                 "suggestion": "Please ensure the inventory backend API is running on port 8000"
             }
             
@@ -67,7 +56,7 @@ def get_product_details(
             return {
                 "error": True,
                 "message": f"Product {product_id} not found in inventory",
-                "endpoint": f"/api/v1/inventory/{product_id}"
+                "endpoint": endpoint
             }
             
         item = data_wrapper[0]
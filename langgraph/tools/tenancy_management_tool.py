@@ -4,68 +4,50 @@ Tools for analyzing tenants, locations, and product catalogs
 """
 
 from langchain_core.tools import tool
-import requests
-import os
-from typing import Optional, Dict, Any, List
+import asyncio
+import time
+from cachetools import TTLCache
+from typing import Optional, Dict, Any
 from datetime import datetime
+from urllib.parse import urlencode
+from collections import Counter, defaultdict
+from functools import lru_cache
 
-BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
-X_TENANT_ID = os.getenv("X_TENANT_ID", "11111111-1111-1111-1111-111111111111")
+from ._api_client import make_api_call as api_call
 
-def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
-    """Helper function to make API calls with proper headers"""
-    url = f"{BASE_URL}{endpoint}"
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
-    # Add tenant header only when needed
-    if X_TENANT_ID and "/tenancy/" not in endpoint:
-        headers["X-Tenant-ID"] = X_TENANT_ID
-    
-    try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data)
-        else:
-            raise ValueError(f"Unsupported method: {method}")
-            
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {
-            "error": True,
-            "message": f"API call failed: {str(e)}",
-            "endpoint": endpoint
-        }
+# Endpoint paths, built once at import
+_TENANTS_PATH = "/api/v1/tenancy/tenants"
+_LOCATIONS_PATH = "/api/v1/tenancy/locations"
+_PRODUCTS_PATH = "/api/v1/tenancy/products"
 
-@tool
-def get_tenant_information(
-    include_locations: bool = True,
-    include_products_summary: bool = True
-) -> Dict[str, Any]:
-    """
-    Get comprehensive tenant information including locations and product overview.
-    
-    Args:
-        include_locations: Include location details for the tenant
-        include_products_summary: Include product catalog summary
-    
-    Returns:
-        Tenant details with business insights and operational overview
-    """
-    
+# Tenant, location and catalog data changes on a scale of minutes; reuse GET responses
+_CACHE = TTLCache(maxsize=256, ttl=300)
+
+@lru_cache(maxsize=1)
+def _iso_for_second(second: int) -> str:
+    """Helper function to format a whole-second epoch as an ISO timestamp"""
+    return datetime.fromtimestamp(second).isoformat()
+
+def _now_iso() -> str:
+    """Helper function to get the current time as an ISO string, reused within the same second"""
+    return _iso_for_second(int(time.time()))
+
+async def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
+    """Helper function to make API calls through the shared client, retrying gateway errors on GETs"""
+    return await api_call(endpoint, method, data, cache=_CACHE, retry_gateway_errors=True)
+
+async def _tenant_information(include_locations: bool, include_products_summary: bool) -> Dict[str, Any]:
+    """Helper function to gather tenant details, fetching only the requested per-tenant sections"""
     try:
         # Get all tenants
-        tenants_data = make_api_call("/api/v1/tenancy/tenants")
+        tenants_data = await make_api_call(_TENANTS_PATH)
         
         # Check if API call returned an error (only if it's a dict)
         if isinstance(tenants_data, dict) and tenants_data.get("error"):
             return {
                 "error": True,
                 "message": f"Unable to connect to backend server: {tenants_data.get('message')}",
-                "endpoint": "/api/v1/tenancy/tenants",
+                "endpoint": _TENANTS_PATH,
                 "suggestion": "Please ensure the inventory backend API is running on port 8000"
             }
         
@@ -77,8 +59,19 @@ def get_tenant_information(
         else:
             tenants = []
         
+        # Fetch per-tenant locations and products concurrently rather than one tenant at a time
+        location_calls = [
+            make_api_call(f"{_LOCATIONS_PATH}?{urlencode({'tenant_id': tenant.get('id')})}") for tenant in tenants
+        ] if include_locations else []
+        product_calls = [
+            make_api_call(f"{_PRODUCTS_PATH}?{urlencode({'tenant_id': tenant.get('id')})}") for tenant in tenants
+        ] if include_products_summary else []
+        results = await asyncio.gather(*location_calls, *product_calls)
+        locations_results = results[:len(location_calls)]
+        products_results = results[len(location_calls):]
+        
         tenant_analysis = []
-        for tenant in tenants:
+        for i, tenant in enumerate(tenants):
             tenant_info = {
                 "id": tenant.get("id"),
                 "name": tenant.get("name", "Unknown"),
@@ -90,7 +83,7 @@ def get_tenant_information(
             
             # Add location information if requested
             if include_locations:
-                locations_data = make_api_call(f"/api/v1/tenancy/locations?tenant_id={tenant.get('id')}")
+                locations_data = locations_results[i]
                 # Check if locations API returned an error (only if it's a dict)
                 if not (isinstance(locations_data, dict) and locations_data.get("error")):
                     locations = locations_data if isinstance(locations_data, list) else [locations_data]
@@ -113,14 +106,14 @@ def get_tenant_information(
             
             # Add product summary if requested
             if include_products_summary:
-                products_data = make_api_call(f"/api/v1/tenancy/products?tenant_id={tenant.get('id')}")
+                products_data = products_results[i]
                 # Check if products API returned an error (only if it's a dict)
                 if not (isinstance(products_data, dict) and products_data.get("error")):
                     products = products_data if isinstance(products_data, list) else [products_data]
                     
                     # Analyze product catalog
-                    product_types = {}
-                    categories = {}
+                    product_types = Counter()
+                    categories = Counter()
                     total_value = 0
                     
                     for product in products:
@@ -128,14 +121,14 @@ def get_tenant_information(
                         category = product.get("category", "uncategorized")
                         price = float(product.get("price", 0))
                         
-                        product_types[product_type] = product_types.get(product_type, 0) + 1
-                        categories[category] = categories.get(category, 0) + 1
+                        product_types[product_type] += 1
+                        categories[category] += 1
                         total_value += price
                     
                     tenant_info["product_catalog"] = {
                         "total_products": len(products),
-                        "product_types": product_types,
-                        "categories": categories,
+                        "product_types": dict(product_types),
+                        "categories": dict(categories),
                         "total_catalog_value": total_value,
                         "average_product_price": total_value / len(products) if products else 0
                     }
@@ -147,16 +140,20 @@ def get_tenant_information(
             
             tenant_analysis.append(tenant_info)
         
+        business_insights = {
+            "total_tenants": len(tenant_analysis),
+            "active_tenants": len([t for t in tenant_analysis if t.get("status") == "active"])
+        }
+        # Location totals only mean something when locations were actually fetched
+        if include_locations:
+            business_insights["total_locations"] = sum(t.get("location_count", 0) for t in tenant_analysis)
+            business_insights["multi_location_tenants"] = len([t for t in tenant_analysis if t.get("location_count", 0) > 1])
+        
         return {
             "success": True,
             "tenant_information": tenant_analysis,
-            "business_insights": {
-                "total_tenants": len(tenant_analysis),
-                "active_tenants": len([t for t in tenant_analysis if t.get("status") == "active"]),
-                "total_locations": sum(t.get("location_count", 0) for t in tenant_analysis),
-                "multi_location_tenants": len([t for t in tenant_analysis if t.get("location_count", 0) > 1])
-            },
-            "generated_at": datetime.now().isoformat()
+            "business_insights": business_insights,
+            "generated_at": _now_iso()
         }
         
     except Exception as e:
@@ -167,7 +164,40 @@ def get_tenant_information(
         }
 
 @tool
-def analyze_product_catalog(
+async def get_tenant_information(
+    include_locations: bool = True,
+    include_products_summary: bool = True
+) -> Dict[str, Any]:
+    """
+    Get comprehensive tenant information including locations and product overview.
+    
+    Each included section costs one request per tenant; with both flags off only the
+    tenant list is fetched and the per-tenant keys are omitted (see list_tenants).
+    
+    Args:
+        include_locations: Include location details for the tenant
+        include_products_summary: Include product catalog summary
+    
+    Returns:
+        Tenant details with business insights and operational overview
+    """
+    return await _tenant_information(include_locations, include_products_summary)
+
+@tool
+async def list_tenants() -> Dict[str, Any]:
+    """
+    List tenants with status and currency, without per-tenant lookups.
+    
+    Fast path for get_tenant_information: a single backend call, served from the
+    response cache while fresh.
+    
+    Returns:
+        Tenant details with business insights, without locations or product catalogs
+    """
+    return await _tenant_information(include_locations=False, include_products_summary=False)
+
+@tool
+async def analyze_product_catalog(
     tenant_id: Optional[str] = None,
     product_type: Optional[str] = None,
     category: Optional[str] = None,
@@ -187,19 +217,15 @@ def analyze_product_catalog(
     """
     
     try:
-        # Build API parameters
-        params = []
-        if tenant_id:
-            params.append(f"tenant_id={tenant_id}")
-        if product_type:
-            params.append(f"type={product_type}")
-        if category:
-            params.append(f"category={category}")
-        
-        query_string = "&".join(params)
-        endpoint = f"/api/v1/tenancy/products?{query_string}" if params else "/api/v1/tenancy/products"
+        # Build API parameters, percent-encoding values such as categories with spaces or '&'
+        params = {
+            key: value
+            for key, value in (("tenant_id", tenant_id), ("type", product_type), ("category", category))
+            if value
+        }
+        endpoint = f"{_PRODUCTS_PATH}?{urlencode(params)}" if params else _PRODUCTS_PATH
         
-        products_data = make_api_call(endpoint)
+        products_data = await make_api_call(endpoint)
         
         # Check if API call returned an error (only if it's a dict)
         if isinstance(products_data, dict) and products_data.get("error"):
@@ -221,8 +247,13 @@ def analyze_product_catalog(
             "products_by_type": {}
         }
         
+        product_types = Counter()
+        categories = Counter()
+        products_by_type = defaultdict(list)
         total_value = 0
-        prices_by_type = {}
+        prices_by_type = defaultdict(list)
+        menu_count = raw_count = 0
+        menu_price_sum = raw_price_sum = 0
         
         for product in products:
             product_type = product.get("type", "unknown")
@@ -231,14 +262,11 @@ def analyze_product_catalog(
             unit = product.get("unit", "")
             
             # Count by type and category
-            catalog_analysis["product_types"][product_type] = catalog_analysis["product_types"].get(product_type, 0) + 1
-            catalog_analysis["categories"][category] = catalog_analysis["categories"].get(category, 0) + 1
+            product_types[product_type] += 1
+            categories[category] += 1
             
             # Track products by type
-            if product_type not in catalog_analysis["products_by_type"]:
-                catalog_analysis["products_by_type"][product_type] = []
-            
-            catalog_analysis["products_by_type"][product_type].append({
+            products_by_type[product_type].append({
                 "id": product.get("id"),
                 "name": product.get("name", "Unknown"),
                 "category": category,
@@ -248,11 +276,21 @@ def analyze_product_catalog(
             })
             
             # Price analysis
-            if product_type not in prices_by_type:
-                prices_by_type[product_type] = []
             prices_by_type[product_type].append(price)
             
             total_value += price
+            
+            # Menu vs raw material totals for the pricing insights
+            if product_type == "menu_item":
+                menu_count += 1
+                menu_price_sum += price
+            elif product_type == "raw_material":
+                raw_count += 1
+                raw_price_sum += price
+        
+        catalog_analysis["product_types"] = dict(product_types)
+        catalog_analysis["categories"] = dict(categories)
+        catalog_analysis["products_by_type"] = dict(products_by_type)
         
         # Pricing analysis
         if include_pricing_analysis and products:
@@ -274,14 +312,11 @@ def analyze_product_catalog(
                     }
             
             # Pricing insights
-            menu_items = [p for p in products if p.get("type") == "menu_item"]
-            raw_materials = [p for p in products if p.get("type") == "raw_material"]
-            
             catalog_analysis["price_analysis"]["pricing_insights"] = {
-                "menu_item_count": len(menu_items),
-                "raw_material_count": len(raw_materials),
-                "avg_menu_price": sum(float(p.get("price", 0)) for p in menu_items) / len(menu_items) if menu_items else 0,
-                "avg_raw_material_cost": sum(float(p.get("price", 0)) for p in raw_materials) / len(raw_materials) if raw_materials else 0,
+                "menu_item_count": menu_count,
+                "raw_material_count": raw_count,
+                "avg_menu_price": menu_price_sum / menu_count if menu_count else 0,
+                "avg_raw_material_cost": raw_price_sum / raw_count if raw_count else 0,
                 "recommendations": [
                     "Review pricing strategy for menu items vs raw material costs",
                     "Ensure adequate profit margins on menu items",
@@ -293,10 +328,10 @@ def analyze_product_catalog(
         # Business insights
         business_insights = {
             "catalog_completeness": "Complete" if len(products) > 50 else "Moderate" if len(products) > 20 else "Limited",
-            "product_diversity": len(catalog_analysis["categories"]),
-            "menu_vs_materials_ratio": (catalog_analysis["product_types"].get("menu_item", 0) / 
-                                      catalog_analysis["product_types"].get("raw_material", 1)),
-            "most_common_category": max(catalog_analysis["categories"].items(), key=lambda x: x[1])[0] if catalog_analysis["categories"] else "N/A"
+            "product_diversity": len(categories),
+            "menu_vs_materials_ratio": (product_types.get("menu_item", 0) / 
+                                      product_types.get("raw_material", 1)),
+            "most_common_category": categories.most_common(1)[0][0] if categories else "N/A"
         }
         
         return {
@@ -314,7 +349,7 @@ def analyze_product_catalog(
                 "Consider expanding under-represented categories",
                 "Analyze profitability of each product type"
             ],
-            "generated_at": datetime.now().isoformat()
+            "generated_at": _now_iso()
         }
         
     except Exception as e:
@@ -325,7 +360,7 @@ def analyze_product_catalog(
         }
 
 @tool
-def get_location_overview(
+async def get_location_overview(
     tenant_id: Optional[str] = None,
     include_operational_metrics: bool = True
 ) -> Dict[str, Any]:
@@ -342,8 +377,8 @@ def get_location_overview(
     
     try:
         # Get locations data
-        endpoint = f"/api/v1/tenancy/locations?tenant_id={tenant_id}" if tenant_id else "/api/v1/tenancy/locations"
-        locations_data = make_api_call(endpoint)
+        endpoint = f"{_LOCATIONS_PATH}?{urlencode({'tenant_id': tenant_id})}" if tenant_id else _LOCATIONS_PATH
+        locations_data = await make_api_call(endpoint)
         
         # Check if API call returned an error (only if it's a dict)
         if isinstance(locations_data, dict) and locations_data.get("error"):
@@ -358,7 +393,7 @@ def get_location_overview(
         
         # Analyze locations
         location_analysis = []
-        geographical_distribution = {}
+        geographical_distribution = Counter()
         
         for location in locations:
             location_info = {
@@ -379,7 +414,7 @@ def get_location_overview(
             country = location.get("country", "Unknown")
             
             geo_key = f"{city}, {state}, {country}"
-            geographical_distribution[geo_key] = geographical_distribution.get(geo_key, 0) + 1
+            geographical_distribution[geo_key] += 1
             
             # Add operational metrics if requested
             if include_operational_metrics:
@@ -397,6 +432,8 @@ def get_location_overview(
             
             location_analysis.append(location_info)
         
+        geographical_distribution = dict(geographical_distribution)
+        
         # Business insights
         business_insights = {
             "total_locations": len(locations),
@@ -421,7 +458,7 @@ def get_location_overview(
                 "Standardize operations across locations",
                 "Consider location-specific inventory strategies"
             ],
-            "generated_at": datetime.now().isoformat()
+            "generated_at": _now_iso()
         }
         
     except Exception as e:
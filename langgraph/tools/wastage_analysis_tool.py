@@ -4,43 +4,47 @@ Comprehensive tools for analyzing wastage patterns, costs, and trends
 """
 
 from langchain_core.tools import tool
-import requests
-import os
+import asyncio
+from cachetools import TTLCache
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 
-BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
-X_TENANT_ID = os.getenv("X_TENANT_ID", "11111111-1111-1111-1111-111111111111")
-X_LOCATION_ID = os.getenv("X_LOCATION_ID", "22222222-2222-2222-2222-222222222222")
+# Wastage analysis is read-only: GETs go out through the shared pooled client,
+# which adds the X-Location-ID header for /wastage endpoints
+from ._api_client import api_get as make_api_call
 
-def make_api_call(endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
-    """Helper function to make API calls with proper headers"""
-    url = f"{BASE_URL}{endpoint}"
-    headers = {
-        "X-Tenant-ID": X_TENANT_ID,
-        "X-Location-ID": X_LOCATION_ID,
-        "Content-Type": "application/json"
-    }
-    
-    try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data)
-        else:
-            raise ValueError(f"Unsupported method: {method}")
-            
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {
-            "error": True,
-            "message": f"API call failed: {str(e)}",
-            "endpoint": endpoint
-        }
+# In-flight or recent wastage GETs, so tools called in the same agent turn share one request
+_SHARED_GETS = TTLCache(maxsize=32, ttl=30)
+
+def _summary_endpoint(start_date_str: str, end_date_str: str) -> str:
+    """Helper function to build the wastage summary endpoint for a date window"""
+    return f"/api/v1/wastage/summary?start_date={start_date_str}&end_date={end_date_str}"
+
+def _records_endpoint(start_date_str: str, end_date_str: str) -> str:
+    """Helper function to build the wastage records endpoint for a date window"""
+    return f"/api/v1/wastage?start_date={start_date_str}&end_date={end_date_str}&limit=200"
+
+def _shared_get(endpoint: str) -> asyncio.Future:
+    """Helper function to start, or join, a wastage GET shared across tools; await it through asyncio.shield"""
+    task = _SHARED_GETS.get(endpoint)
+    if task is None:
+        task = asyncio.ensure_future(make_api_call(endpoint))
+        _SHARED_GETS[endpoint] = task
+        
+        def _evict_failed(done: asyncio.Future) -> None:
+            # Failed calls are not shared; the next tool retries them
+            failed = done.cancelled() or done.exception() is not None
+            if not failed:
+                result = done.result()
+                failed = isinstance(result, dict) and bool(result.get("error"))
+            if failed and _SHARED_GETS.get(endpoint) is done:
+                del _SHARED_GETS[endpoint]
+        
+        task.add_done_callback(_evict_failed)
+    return task
 
 @tool
-def get_wastage_summary(
+async def get_wastage_summary(
     days_back: int = 30,
     include_trends: bool = True,
     include_cost_analysis: bool = True
@@ -67,7 +71,7 @@ def get_wastage_summary(
         start_date_str = start_date.strftime("%Y-%m-%d")
         end_date_str = end_date.strftime("%Y-%m-%d")
         
-        wastage_summary = make_api_call(f"/api/v1/wastage/summary?start_date={start_date_str}&end_date={end_date_str}")
+        wastage_summary = await asyncio.shield(_shared_get(_summary_endpoint(start_date_str, end_date_str)))
         
         # Check if API call returned an error (only if it's a dict)
         if isinstance(wastage_summary, dict) and wastage_summary.get("error"):
@@ -137,7 +141,7 @@ def get_wastage_summary(
         }
 
 @tool
-def analyze_wastage_by_product(
+async def analyze_wastage_by_product(
     product_id: Optional[str] = None,
     reason_filter: Optional[str] = None,
     days_back: int = 30,
@@ -176,7 +180,7 @@ def analyze_wastage_by_product(
         params.append(f"limit={limit}")
         
         query_string = "&".join(params)
-        wastage_data = make_api_call(f"/api/v1/wastage?{query_string}")
+        wastage_data = await make_api_call(f"/api/v1/wastage?{query_string}")
         
         # Check if API call returned an error (only if it's a dict)
         if isinstance(wastage_data, dict) and wastage_data.get("error"):
@@ -285,7 +289,7 @@ def analyze_wastage_by_product(
         }
 
 @tool
-def track_wastage_trends(
+async def track_wastage_trends(
     time_period: str = "monthly",
     months_back: int = 6
 ) -> Dict[str, Any]:
@@ -309,7 +313,7 @@ def track_wastage_trends(
         # Use simple date format (YYYY-MM-DD) instead of full ISO format to avoid API encoding issues
         start_date_str = start_date.strftime("%Y-%m-%d")
         end_date_str = end_date.strftime("%Y-%m-%d")
-        wastage_data = make_api_call(f"/api/v1/wastage?start_date={start_date_str}&end_date={end_date_str}&limit=200")
+        wastage_data = await asyncio.shield(_shared_get(_records_endpoint(start_date_str, end_date_str)))
         
         # Check if API call returned an error (only if it's a dict)
         if isinstance(wastage_data, dict) and wastage_data.get("error"):
@@ -407,7 +411,7 @@ def track_wastage_trends(
         }
 
 @tool
-def get_wastage_trends(
+async def get_wastage_trends(
     date_range: str = "last_30_days",
     group_by: str = "week"
 ) -> Dict[str, Any]:
@@ -439,14 +443,8 @@ def get_wastage_trends(
         start_date_str = start_date.strftime("%Y-%m-%d")
         end_date_str = end_date.strftime("%Y-%m-%d")
         
-        params = {
-            "start_date": start_date_str,
-            "end_date": end_date_str,
-            "limit": 200  # Get comprehensive data for trend analysis
-        }
-        
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        wastage_data = make_api_call(f"/api/v1/wastage?{query_string}")
+        # Up to 200 records for comprehensive trend analysis
+        wastage_data = await asyncio.shield(_shared_get(_records_endpoint(start_date_str, end_date_str)))
         
         # Check if API call returned an error (only if it's a dict)
         if isinstance(wastage_data, dict) and wastage_data.get("error"):
@@ -623,7 +621,7 @@ def get_wastage_trends(
         }
 
 @tool
-def get_top_wastage_products(
+async def get_top_wastage_products(
     limit: int = 10,
     date_range: str = "last_30_days"
 ) -> Dict[str, Any]:
@@ -655,14 +653,7 @@ def get_top_wastage_products(
         start_date_str = start_date.strftime("%Y-%m-%d")
         end_date_str = end_date.strftime("%Y-%m-%d")
         
-        params = {
-            "start_date": start_date_str,
-            "end_date": end_date_str,
-            "limit": 200
-        }
-        
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        wastage_data = make_api_call(f"/api/v1/wastage?{query_string}")
+        wastage_data = await asyncio.shield(_shared_get(_records_endpoint(start_date_str, end_date_str)))
         
         # Check if API call returned an error (only if it's a dict)
         if isinstance(wastage_data, dict) and wastage_data.get("error"):
@@ -830,7 +821,7 @@ def get_top_wastage_products(
         }
 
 @tool
-def get_wastage_by_date(date: str) -> Dict[str, Any]:
+async def get_wastage_by_date(date: str) -> Dict[str, Any]:
     """
     Date-specific wastage analysis using real data from wastage records.
     
@@ -859,19 +850,24 @@ def get_wastage_by_date(date: str) -> Dict[str, Any]:
         start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
         end_date = start_date + timedelta(days=1)
         
-        # Fetch wastage data for the specific date
+        # Window for the specific date
         # Use simple date format (YYYY-MM-DD) instead of full ISO format to avoid API encoding issues
         start_date_str = start_date.strftime("%Y-%m-%d")
         end_date_str = end_date.strftime("%Y-%m-%d")
         
-        params = {
-            "start_date": start_date_str,
-            "end_date": end_date_str,
-            "limit": 200
-        }
+        # Also get data for comparison (previous 7 days)
+        comparison_start = start_date - timedelta(days=7)
+        comparison_end = start_date
         
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        wastage_data = make_api_call(f"/api/v1/wastage?{query_string}")
+        # Use simple date format (YYYY-MM-DD) instead of full ISO format to avoid API encoding issues
+        comparison_start_str = comparison_start.strftime("%Y-%m-%d")
+        comparison_end_str = comparison_end.strftime("%Y-%m-%d")
+        
+        # Fetch the target day and the comparison week concurrently
+        wastage_data, comparison_data = await asyncio.gather(
+            asyncio.shield(_shared_get(_records_endpoint(start_date_str, end_date_str))),
+            asyncio.shield(_shared_get(_records_endpoint(comparison_start_str, comparison_end_str)))
+        )
         
         # Check if API call returned an error (only if it's a dict)
         if isinstance(wastage_data, dict) and wastage_data.get("error"):
@@ -883,23 +879,6 @@ def get_wastage_by_date(date: str) -> Dict[str, Any]:
         
         wastage_records = wastage_data if isinstance(wastage_data, list) else wastage_data.get("records", [])
         
-        # Also get data for comparison (previous 7 days)
-        comparison_start = start_date - timedelta(days=7)
-        comparison_end = start_date
-        
-        # Use simple date format (YYYY-MM-DD) instead of full ISO format to avoid API encoding issues
-        comparison_start_str = comparison_start.strftime("%Y-%m-%d")
-        comparison_end_str = comparison_end.strftime("%Y-%m-%d")
-        
-        comparison_params = {
-            "start_date": comparison_start_str,
-            "end_date": comparison_end_str,
-            "limit": 200
-        }
-        
-        comparison_query = "&".join([f"{k}={v}" for k, v in comparison_params.items()])
-        comparison_data = make_api_call(f"/api/v1/wastage?{comparison_query}")
-        
         comparison_records = []
         if not comparison_data.get("error"):
             comparison_records = comparison_data if isinstance(comparison_data, list) else comparison_data.get("records", [])